@@ -2,12 +2,76 @@
 Web wrapper for Gemini Function Calling demonstration.
 Exposes the CLI functionality via HTTP endpoints for deployment on Render.
 """
-from flask import Flask, request, jsonify, send_from_directory
-from gemini_client import GeminiFunctionCallingClient
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from gemini_client import GeminiFunctionCallingClient, warm_up as warm_gemini
+from functions import warm_connections
+import hashlib
+import orjson
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster (de)serialization."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__, static_folder='static', static_url_path='')
+app.json = OrjsonProvider(app)
+
+
+def orjson_response(payload, status=200):
+    """Build a JSON response directly from orjson bytes, skipping the str round-trip."""
+    body = orjson.dumps(payload, default=app.json.default, option=ORJSON_OPTIONS)
+    return app.response_class(body, status=status, mimetype='application/json')
+
+
+def parse_chat_request():
+    """
+    Decode and validate a chat request body straight from the raw request bytes.
+    Returns (message, verbose); raises ValueError describing the first problem found.
+    """
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        raise ValueError("Request body must be valid JSON")
+    
+    if not isinstance(data, dict) or 'message' not in data:
+        raise ValueError("Missing 'message' field in request body")
+    
+    message = data['message']
+    verbose = data.get('verbose', False)
+    if not isinstance(message, str):
+        raise ValueError("'message' must be a string")
+    if not isinstance(verbose, bool):
+        raise ValueError("'verbose' must be a boolean")
+    return message, verbose
+
+
+# The client holds a single chat session, so requests served on different
+# threads must not interleave their use of it
+client_lock = threading.Lock()
+
+# Background chat turns queued with /chat?async=1. The pool bounds how many
+# threads can be tied up waiting on Gemini; results are kept until fetched
+# or until they expire.
+CHAT_JOB_WORKERS = 8
+CHAT_JOB_TTL_SECONDS = 600
+chat_executor = ThreadPoolExecutor(max_workers=CHAT_JOB_WORKERS, thread_name_prefix='chat-job')
+chat_jobs = {}  # job_id -> (future, submitted_at)
+chat_jobs_lock = threading.Lock()
 
 # Initialize the Gemini client
 client = None
@@ -23,10 +87,55 @@ except Exception as e:
     traceback.print_exc(file=sys.stderr)
 
 
+def warm_all_connections():
+    """Warm the outbound HTTP pool and, if the client is up, the Gemini channel."""
+    warm_connections()
+    if client is not None:
+        warm_gemini()
+
+
+# Warm outbound connections in the background so startup isn't delayed.
+# Under gunicorn (without --preload) this runs in each worker after the fork,
+# so pooled sockets are never shared between processes.
+threading.Thread(target=warm_all_connections, name='warm-connections', daemon=True).start()
+
+
+def run_chat_turn(user_message, verbose):
+    """Send a message to Gemini and record the exchange in the conversation history."""
+    with client_lock:
+        flow_info = client.send_message(user_message, verbose=verbose)
+        client.add_to_history(flow_info)
+    return flow_info
+
+
+def chat_response_payload(flow_info):
+    """Shape a completed chat turn for the HTTP response."""
+    return {
+        "response": flow_info['final_response'],
+        "function_calls": flow_info['function_calls'],
+        "api_responses": flow_info['api_responses']
+    }
+
+
+def submit_chat_job(user_message, verbose):
+    """Queue a chat turn on the background pool and return its job id."""
+    job_id = uuid4().hex
+    now = time.monotonic()
+    with chat_jobs_lock:
+        # Drop finished results nobody collected
+        expired = [jid for jid, (future, submitted_at) in chat_jobs.items()
+                   if future.done() and now - submitted_at > CHAT_JOB_TTL_SECONDS]
+        for jid in expired:
+            del chat_jobs[jid]
+        chat_jobs[job_id] = (chat_executor.submit(run_chat_turn, user_message, verbose), now)
+    return job_id
+
+
 @app.route('/', methods=['GET'])
 def index():
     """Serve the main UI page."""
-    return send_from_directory('static', 'index.html')
+    # send_from_directory already sets an ETag and answers If-None-Match with 304
+    return send_from_directory('static', 'index.html', max_age=60)
 
 
 @app.route('/health', methods=['GET'])
@@ -51,6 +160,8 @@ def health():
             "/": "UI (GET)",
             "/health": "Health check (GET)",
             "/chat": "Send a message to Gemini (POST)",
+            "/chat/result/<job_id>": "Get the result of a chat queued with /chat?async=1 (GET)",
+            "/chat/stream": "Send a message to Gemini, streaming progress as Server-Sent Events (POST)",
             "/chat/new": "Start a new chat session (POST)",
             "/history": "Get conversation history (GET)"
         }
@@ -72,27 +183,94 @@ def chat():
         }), 500
     
     try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({"error": "Missing 'message' field in request body"}), 400
+        try:
+            user_message, verbose = parse_chat_request()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        user_message = data['message']
-        verbose = data.get('verbose', False)
+        # ?async=1 queues the turn and returns a job id to poll via /chat/result/<job_id>
+        if request.args.get('async') == '1':
+            job_id = submit_chat_job(user_message, verbose)
+            return jsonify({"job_id": job_id, "status": "pending"}), 202
         
         # Send message to Gemini
-        flow_info = client.send_message(user_message, verbose=verbose)
-        client.conversation_history.append(flow_info)
-        
-        return jsonify({
-            "response": flow_info['final_response'],
-            "function_calls": flow_info['function_calls'],
-            "api_responses": flow_info['api_responses']
-        }), 200
+        flow_info = run_chat_turn(user_message, verbose)
+        return orjson_response(chat_response_payload(flow_info))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/chat/result/<job_id>', methods=['GET'])
+def chat_result(job_id):
+    """Get the result of a chat request queued with /chat?async=1."""
+    with chat_jobs_lock:
+        job = chat_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job id: {job_id}"}), 404
+        future = job[0]
+        if not future.done():
+            return jsonify({"job_id": job_id, "status": "pending"}), 202
+        del chat_jobs[job_id]
+    
+    try:
+        flow_info = future.result()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return orjson_response(chat_response_payload(flow_info))
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat requests, streaming progress as Server-Sent Events."""
+    if client is None:
+        error_msg = "Gemini client not initialized."
+        if init_error:
+            error_msg += f" Error: {init_error}"
+        else:
+            error_msg += " Check GEMINI_API_KEY environment variable."
+        return jsonify({
+            "error": error_msg,
+            "error_details": init_error
+        }), 500
+    
+    try:
+        user_message, verbose = parse_chat_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def sse(event):
+        return b"data: " + orjson.dumps(event, default=app.json.default, option=ORJSON_OPTIONS) + b"\n\n"
+    
+    def generate():
+        # Hold the lock for the whole turn. If the client disconnects, close the
+        # turn while still holding it so the chat session is rolled back before
+        # another request can use it
+        with client_lock:
+            stream = client.stream_message(user_message, verbose=verbose)
+            try:
+                for event in stream:
+                    if event['type'] == 'done':
+                        flow_info = event['flow_info']
+                        client.add_to_history(flow_info)
+                        event = {
+                            "type": "done",
+                            "response": flow_info['final_response'],
+                            "function_calls": flow_info['function_calls'],
+                            "api_responses": flow_info['api_responses']
+                        }
+                    yield sse(event)
+            except Exception as e:
+                yield sse({"type": "error", "error": str(e)})
+            finally:
+                stream.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @app.route('/chat/new', methods=['POST'])
 def new_chat():
     """Start a new chat session."""
@@ -108,7 +286,8 @@ def new_chat():
         }), 500
     
     try:
-        client.start_chat()
+        with client_lock:
+            client.start_chat()
         return jsonify({
             "message": "New chat session started",
             "conversation_history_cleared": True
@@ -132,10 +311,20 @@ def get_history():
         }), 500
     
     try:
-        return jsonify({
-            "conversation_history": client.conversation_history,
-            "summary": client.get_conversation_summary()
-        }), 200
+        with client_lock:
+            payload = {
+                "conversation_history": client.get_history(),
+                "summary_head": client.summary_head,
+                "summary": client.get_conversation_summary()
+            }
+        
+        # History only changes after /chat, so let clients revalidate by content hash
+        body = orjson.dumps(payload, default=app.json.default, option=ORJSON_OPTIONS)
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, must-revalidate'}
+        if request.if_none_match.contains(etag):
+            return '', 304, headers
+        return app.response_class(body, status=200, mimetype='application/json', headers=headers)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -22,11 +22,24 @@ MINYAN_API_BASE_URL = os.getenv('MINYAN_API_BASE_URL', 'http://localhost:5000')
 # Default to gemini-2.5-flash
 GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
 
+# Build Gemini function declarations from openapi.yaml at runtime instead of
+# using the pregenerated generated_functions.py (useful while editing the spec)
+GEMINI_FUNCTIONS_FROM_SPEC = os.getenv('GEMINI_FUNCTIONS_FROM_SPEC', '').lower() in ('1', 'true', 'yes')
+
+# Conversation History Configuration
+# Recent exchanges kept verbatim; older ones are folded into a compact summary
+HISTORY_MAX_TURNS = int(os.getenv('HISTORY_MAX_TURNS', '50'))
+# Approximate token budget (chars / 4) for the verbatim history
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '8000'))
+
 def get_config():
     """Get configuration dictionary."""
     return {
         'gemini_api_key': GEMINI_API_KEY,
         'minyan_api_base_url': MINYAN_API_BASE_URL,
-        'gemini_model': GEMINI_MODEL
+        'gemini_model': GEMINI_MODEL,
+        'gemini_functions_from_spec': GEMINI_FUNCTIONS_FROM_SPEC,
+        'history_max_turns': HISTORY_MAX_TURNS,
+        'history_token_budget': HISTORY_TOKEN_BUDGET
     }
 
@@ -2,10 +2,71 @@
 Function declarations and handlers for Gemini function calling.
 Converts OpenAPI spec to Gemini function declarations and handles API calls.
 """
+import bisect
+import functools
+import json
+import os
+import re
+from collections import OrderedDict, defaultdict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import yaml
 import requests
-from typing import Dict, Any, List, Optional
-from config import MINYAN_API_BASE_URL
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from config import MINYAN_API_BASE_URL, GEMINI_FUNCTIONS_FROM_SPEC
+from geo import GeohashIndex
+
+# Prefer the libyaml C parser when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Shared HTTP session so outbound calls reuse pooled keep-alive connections
+# instead of paying a TCP + TLS handshake on every function call
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': 'MinyanFinder/1.0'})  # Required by Nominatim
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    # raise_on_status=False hands back the last 5xx response once retries run out, so
+    # raise_for_status() still reports its status code and body
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                      raise_on_status=False)
+)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+# Upper bound on function calls executed concurrently
+MAX_PARALLEL_FUNCTION_CALLS = 8
+# Long-lived pool for network-bound handlers, shared by every chat turn so
+# concurrent calls don't pay thread start-up on each model response
+_FUNCTION_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_PARALLEL_FUNCTION_CALLS,
+                                        thread_name_prefix='function-call')
+
+# ETag validators for conditional GETs: (url, params) -> (etag, parsed body)
+# (in insertion order); shared by the function-call pool's threads, hence the lock
+_ETAG_CACHE: 'OrderedDict[Any, Any]' = OrderedDict()
+_ETAG_CACHE_MAX_ENTRIES = 256
+_ETAG_CACHE_LOCK = threading.Lock()
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.1
+_NOMINATIM_HOST = 'https://nominatim.openstreetmap.org'
+_NOMINATIM_URL = _NOMINATIM_HOST + '/search'
+_NOMINATIM_LOCK = threading.Lock()
+_nominatim_last_request = 0.0
+
+# Geocode results: normalized location -> (expires_at, result), in LRU order.
+# Nominatim data changes rarely, so a day-long TTL keeps coordinates fresh enough.
+GEOCODE_CACHE_MAX_ENTRIES = 1024
+GEOCODE_CACHE_TTL_SECONDS = 24 * 60 * 60
+_GEOCODE_CACHE: 'OrderedDict[str, Tuple[float, Optional[Tuple[float, float, str]]]]' = OrderedDict()
+_GEOCODE_CACHE_LOCK = threading.Lock()
 
 # City to coordinates mapping for common US cities
 # Format: "City, State" -> (latitude, longitude)
@@ -163,11 +224,75 @@ CITY_COORDINATES = {
     'Lockport, NY': (43.1706, -78.6903),
 }
 
+# Parallel arrays over CITY_COORDINATES (in map order); the lookup indexes below
+# store positions into them, so matches compare and tie-break on plain ints
+_CITY_NAMES: List[str] = list(CITY_COORDINATES)
+_CITY_LATS: List[float] = [lat for lat, _ in CITY_COORDINATES.values()]
+_CITY_LONS: List[float] = [lon for _, lon in CITY_COORDINATES.values()]
+_CITY_NAME_TO_IDX: Dict[str, int] = {city: i for i, city in enumerate(_CITY_NAMES)}
+# Lowercased state of each city ('' when the key has none)
+_CITY_STATES: List[str] = [city.rsplit(',', 1)[1].strip().lower() if ',' in city else ''
+                           for city in _CITY_NAMES]
+_STATE_TOKENS = frozenset(state for state in _CITY_STATES if state)
+
+# Lookup indexes built once at import: lowercased key -> city index
+_CITY_LOWER: Dict[str, int] = {city.lower(): i for i, city in enumerate(_CITY_NAMES)}
+# Lowercased city name without the state; the first entry wins for duplicate names
+_CITY_NAME_ONLY: Dict[str, int] = {}
+for _i, _city in enumerate(_CITY_NAMES):
+    _CITY_NAME_ONLY.setdefault(_city.split(',')[0].strip().lower(), _i)
+# Sorted lowercased full keys and city names for bisect-based prefix search
+_CITY_PREFIX_KEYS = sorted(set(_CITY_LOWER) | set(_CITY_NAME_ONLY))
+_CITY_PREFIX_KEY_SET = frozenset(_CITY_PREFIX_KEYS)
+# Word-level inverted index: token -> indexes of cities containing it, ascending
+_TOKEN_SPLIT_RE = re.compile(r'[,\s]+')
+_CITY_TOKENS: List[frozenset] = [frozenset(t for t in _TOKEN_SPLIT_RE.split(city.lower()) if t)
+                                 for city in _CITY_NAMES]
+_CITY_TOKEN_INDEX: Dict[str, List[int]] = defaultdict(list)
+for _i, _tokens in enumerate(_CITY_TOKENS):
+    for _token in _tokens:
+        _CITY_TOKEN_INDEX[_token].append(_i)
+_CITY_TOKEN_INDEX = dict(_CITY_TOKEN_INDEX)
+del _i, _city, _tokens, _token
 
+# Geohash buckets for nearest-known-city lookups
+_CITY_GEO_INDEX = GeohashIndex(CITY_COORDINATES)
+
+# A location given as "latitude, longitude"
+_COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+@functools.lru_cache(maxsize=4)
 def load_openapi_spec(file_path: str = 'openapi.yaml') -> Dict[str, Any]:
-    """Load and parse the OpenAPI specification file."""
+    """
+    Load and parse the OpenAPI specification file.
+    Prefers an up-to-date JSON sibling (e.g. openapi.json, written by
+    tools/convert_spec.py), since JSON parses far faster than YAML.
+    The spec is static at runtime, so each path is parsed once per process;
+    callers must treat the returned dict as read-only.
+    """
+    json_path = os.path.splitext(file_path)[0] + '.json'
+    if (json_path != file_path and os.path.exists(json_path) and
+            os.path.getmtime(json_path) >= os.path.getmtime(file_path)):
+        with open(json_path, 'rb') as f:
+            return json.loads(f.read())
+    
     with open(file_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def _append_constraints(prop: Dict[str, Any], schema: Dict[str, Any]) -> None:
+    """Append min/max constraints to a property's description, since Gemini's schema drops them."""
+    minimum, maximum = schema.get('minimum'), schema.get('maximum')
+    if minimum is None and maximum is None:
+        return
+    if minimum is None:
+        constraints = f"maximum: {maximum}"
+    elif maximum is None:
+        constraints = f"minimum: {minimum}"
+    else:
+        constraints = f"minimum: {minimum}, maximum: {maximum}"
+    prop['description'] = f"{prop.get('description', '')} (Constraints: {constraints})".strip()
 
 
 def convert_openapi_to_gemini_functions(openapi_spec: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -179,14 +304,22 @@ def convert_openapi_to_gemini_functions(openapi_spec: Dict[str, Any]) -> List[Di
     paths = openapi_spec.get('paths', {})
     components = openapi_spec.get('components', {}).get('schemas', {})
     
+    # Converted schemas by $ref, so a schema referenced by several operations is walked once
+    schema_cache: Dict[str, Dict[str, Any]] = {}
+    
     # Helper function to convert OpenAPI schema to JSON schema
     def convert_schema(schema_ref: str) -> Dict[str, Any]:
         """Convert OpenAPI schema reference to JSON schema."""
+        if schema_ref in schema_cache:
+            return schema_cache[schema_ref]
+        
+        converted = {}
         if schema_ref.startswith('#/components/schemas/'):
             schema_name = schema_ref.split('/')[-1]
             schema = components.get(schema_name, {})
-            return convert_openapi_schema_to_json(schema)
-        return {}
+            converted = convert_openapi_schema_to_json(schema)
+        schema_cache[schema_ref] = converted
+        return converted
     
     def convert_openapi_schema_to_json(schema: Dict[str, Any]) -> Dict[str, Any]:
         """Convert OpenAPI schema to JSON schema format."""
@@ -211,17 +344,7 @@ def convert_openapi_to_gemini_functions(openapi_spec: Dict[str, Any]) -> List[Di
                 if 'enum' in prop_schema:
                     prop_json['enum'] = prop_schema['enum']
                 
-                # Note: Gemini function calling API doesn't support minimum/maximum constraints
-                # Add constraint info to description if present
-                if 'minimum' in prop_schema or 'maximum' in prop_schema:
-                    constraints = []
-                    if 'minimum' in prop_schema:
-                        constraints.append(f"minimum: {prop_schema['minimum']}")
-                    if 'maximum' in prop_schema:
-                        constraints.append(f"maximum: {prop_schema['maximum']}")
-                    if constraints:
-                        prop_json['description'] = (prop_json.get('description', '') + 
-                                                    f" (Constraints: {', '.join(constraints)})").strip()
+                _append_constraints(prop_json, prop_schema)
                 
                 json_schema['properties'][prop_name] = prop_json
         
@@ -263,17 +386,7 @@ def convert_openapi_to_gemini_functions(openapi_spec: Dict[str, Any]) -> List[Di
             if 'enum' in param_schema:
                 prop['enum'] = param_schema['enum']
             
-            # Note: Gemini function calling API doesn't support minimum/maximum constraints
-            # Add constraint info to description if present
-            if 'minimum' in param_schema or 'maximum' in param_schema:
-                constraints = []
-                if 'minimum' in param_schema:
-                    constraints.append(f"minimum: {param_schema['minimum']}")
-                if 'maximum' in param_schema:
-                    constraints.append(f"maximum: {param_schema['maximum']}")
-                if constraints:
-                    prop['description'] = (prop.get('description', '') + 
-                                          f" (Constraints: {', '.join(constraints)})").strip()
+            _append_constraints(prop, param_schema)
             
             properties[param_name] = prop
             
@@ -293,6 +406,68 @@ def convert_openapi_to_gemini_functions(openapi_spec: Dict[str, Any]) -> List[Di
     return functions
 
 
+def warm_connections(timeout: float = 2) -> None:
+    """
+    Open pooled connections to the Minyan API and Nominatim ahead of the first
+    function call, so DNS resolution and the TLS handshake are paid at startup.
+    Failures are ignored; the first real request simply connects as usual.
+    """
+    for host in (MINYAN_API_BASE_URL, _NOMINATIM_HOST):
+        try:
+            _SESSION.head(host, timeout=timeout)
+        except requests.exceptions.RequestException:
+            pass
+
+
+def _json(response: requests.Response) -> Any:
+    """
+    Decode a response body with orjson instead of the stdlib-backed response.json().
+    Decode errors are re-raised as requests' JSONDecodeError so callers handle them as before.
+    """
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos, response=response) from e
+
+
+def _error_payload(e: requests.exceptions.RequestException) -> Dict[str, Any]:
+    """Build the failure result for a request error, including any HTTP response details."""
+    resp = getattr(e, 'response', None)
+    return {
+        'success': False,
+        'error': str(e),
+        'status_code': getattr(resp, 'status_code', None),
+        'response_text': getattr(resp, 'text', None)
+    }
+
+
+def _conditional_get_json(url: str, params: Dict[str, Any]) -> Any:
+    """
+    GET a JSON resource, revalidating with If-None-Match when an ETag is cached.
+    On 304 Not Modified the previously parsed body is returned without a transfer.
+    """
+    # repr() keeps the key hashable when a parameter is a list or dict
+    key = (url, tuple(sorted((k, repr(v)) for k, v in params.items())))
+    with _ETAG_CACHE_LOCK:
+        cached = _ETAG_CACHE.get(key)
+    headers = {'If-None-Match': cached[0]} if cached else None
+    
+    response = _SESSION.get(url, params=params, headers=headers, timeout=10)
+    if cached and response.status_code == 304:
+        return cached[1]
+    response.raise_for_status()
+    
+    data = _json(response)
+    etag = response.headers.get('ETag')
+    if etag:
+        with _ETAG_CACHE_LOCK:
+            if key not in _ETAG_CACHE and len(_ETAG_CACHE) >= _ETAG_CACHE_MAX_ENTRIES:
+                # Evict the oldest validator
+                _ETAG_CACHE.popitem(last=False)
+            _ETAG_CACHE[key] = (etag, data)
+    return data
+
+
 def handle_create_broadcast(args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Handle the createBroadcast function call.
@@ -301,19 +476,14 @@ def handle_create_broadcast(args: Dict[str, Any]) -> Dict[str, Any]:
     url = f"{MINYAN_API_BASE_URL}/broadcasts"
     
     try:
-        response = requests.post(url, json=args, timeout=10)
+        response = _SESSION.post(url, json=args, timeout=10)
         response.raise_for_status()
         return {
             'success': True,
-            'data': response.json()
+            'data': _json(response)
         }
     except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'status_code': getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None,
-            'response_text': getattr(e.response, 'text', None) if hasattr(e, 'response') else None
-        }
+        return _error_payload(e)
 
 
 def handle_find_nearby_broadcasts(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -324,19 +494,143 @@ def handle_find_nearby_broadcasts(args: Dict[str, Any]) -> Dict[str, Any]:
     url = f"{MINYAN_API_BASE_URL}/broadcasts/nearby"
     
     try:
-        response = requests.get(url, params=args, timeout=10)
-        response.raise_for_status()
         return {
             'success': True,
-            'data': response.json()
+            'data': _conditional_get_json(url, args)
         }
     except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'status_code': getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None,
-            'response_text': getattr(e.response, 'text', None) if hasattr(e, 'response') else None
+        return _error_payload(e)
+
+
+def _nominatim_get(url: str, params: Dict[str, Any]) -> Any:
+    """
+    Issue a Nominatim request, spacing calls at least NOMINATIM_MIN_INTERVAL apart.
+    Only cache misses reach this point, so the limiter never delays cached lookups.
+    """
+    global _nominatim_last_request
+    with _NOMINATIM_LOCK:
+        wait = _nominatim_last_request + NOMINATIM_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return _conditional_get_json(url, params)
+        finally:
+            _nominatim_last_request = time.monotonic()
+
+
+def _geocode_uncached(location_norm: str) -> Optional[Tuple[float, float, str]]:
+    """
+    Resolve a normalized location string via the Nominatim API.
+    Returns (latitude, longitude, display_name), or None if nothing matched.
+    """
+    results = _nominatim_get(_NOMINATIM_URL, {'q': location_norm, 'format': 'json', 'limit': 1})
+    if not results:
+        return None
+    
+    result = results[0]
+    return float(result['lat']), float(result['lon']), result.get('display_name', '')
+
+
+def _geocode_cached(location_norm: str) -> Optional[Tuple[float, float, str]]:
+    """
+    Resolve a normalized location string, serving repeats from the TTL'd LRU cache.
+    Results (including misses) are cached; request errors propagate and are not cached.
+    """
+    now = time.monotonic()
+    with _GEOCODE_CACHE_LOCK:
+        entry = _GEOCODE_CACHE.get(location_norm)
+        if entry is not None:
+            if entry[0] > now:
+                _GEOCODE_CACHE.move_to_end(location_norm)
+                return entry[1]
+            del _GEOCODE_CACHE[location_norm]
+    
+    result = _geocode_uncached(location_norm)
+    
+    with _GEOCODE_CACHE_LOCK:
+        _GEOCODE_CACHE[location_norm] = (time.monotonic() + GEOCODE_CACHE_TTL_SECONDS, result)
+        _GEOCODE_CACHE.move_to_end(location_norm)
+        while len(_GEOCODE_CACHE) > GEOCODE_CACHE_MAX_ENTRIES:
+            _GEOCODE_CACHE.popitem(last=False)
+    return result
+
+
+def _city_prefix_match(location_lower: str) -> Optional[int]:
+    """
+    Match a query against the start of known city keys/names, or known names against
+    the start of the query (ending on a word boundary, e.g. "cedarhurst ny").
+    Uses binary search over the sorted keys instead of scanning every city.
+    """
+    def lookup(key):
+        i = _CITY_LOWER.get(key)
+        return _CITY_NAME_ONLY[key] if i is None else i
+    
+    # Known keys that start with the query: prefer the earliest entry in the map.
+    # Skipped for very short queries and bare states ("ma", "fl"), which would
+    # otherwise resolve to whichever city name happens to start with those letters
+    if len(location_lower) >= 3 and location_lower not in _STATE_TOKENS:
+        pos = bisect.bisect_left(_CITY_PREFIX_KEYS, location_lower)
+        candidates = []
+        while pos < len(_CITY_PREFIX_KEYS) and _CITY_PREFIX_KEYS[pos].startswith(location_lower):
+            candidates.append(lookup(_CITY_PREFIX_KEYS[pos]))
+            pos += 1
+        if candidates:
+            return min(candidates)
+    
+    # Known keys that are a prefix of the query: prefer the longest (most specific).
+    # Only accept it when nothing but that city's own state follows, so other places
+    # sharing a name ("portland, me", "long beach, ca") fall through to Nominatim
+    for end in range(len(location_lower) - 1, 0, -1):
+        if not location_lower[end].isalnum() and location_lower[:end] in _CITY_PREFIX_KEY_SET:
+            i = lookup(location_lower[:end])
+            rest = location_lower[end:].strip(' ,.')
+            if not rest or rest == _CITY_STATES[i]:
+                return i
+    return None
+
+
+def _city_token_match(location_lower: str) -> Optional[int]:
+    """
+    Match the query's words against the inverted token index.
+    Candidates must contain every query token, and any word the index doesn't know
+    means no match (so "springfield, il" is left to Nominatim rather than matching
+    on "il"); among several, prefer a city whose own words all appear in the query
+    (most words first, then map order).
+    """
+    tokens = [t for t in _TOKEN_SPLIT_RE.split(location_lower) if t]
+    if not tokens or any(t not in _CITY_TOKEN_INDEX for t in tokens):
+        return None
+    postings = [_CITY_TOKEN_INDEX[t] for t in tokens]
+    
+    candidates = set(postings[0]).intersection(*postings[1:])
+    if not candidates:
+        return None
+    if len(candidates) > 1:
+        query_tokens = set(tokens)
+        covered = [i for i in candidates if _CITY_TOKENS[i] <= query_tokens]
+        if not covered:
+            return None
+        candidates = covered
+    return min(candidates, key=lambda i: (-len(_CITY_TOKENS[i]), i))
+
+
+def _nearest_known_city(lat: float, lon: float) -> Optional[Tuple[str, float]]:
+    """Return (city, distance in miles) of the closest entry in CITY_COORDINATES, if one is nearby."""
+    return _CITY_GEO_INDEX.nearest(lat, lon)
+
+
+def _local_map_result(location: str, i: int) -> Dict[str, Any]:
+    """Build a successful geocoding result for the city at index i of the local map."""
+    return {
+        'success': True,
+        'data': {
+            'location': location,
+            'latitude': _CITY_LATS[i],
+            'longitude': _CITY_LONS[i],
+            'display_name': _CITY_NAMES[i],
+            'source': 'local_map'
         }
+    }
 
 
 def handle_geocode_location(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -351,85 +645,71 @@ def handle_geocode_location(args: Dict[str, Any]) -> Dict[str, Any]:
             'error': 'Location parameter is required'
         }
     
-    # Normalize location string for lookup (case-insensitive)
-    location_normalized = location
-    
     # Try exact match first
-    if location_normalized in CITY_COORDINATES:
-        lat, lon = CITY_COORDINATES[location_normalized]
-        return {
-            'success': True,
-            'data': {
-                'location': location,
-                'latitude': lat,
-                'longitude': lon,
-                'display_name': location,
-                'source': 'local_map'
-            }
-        }
+    match = _CITY_NAME_TO_IDX.get(location)
+    if match is not None:
+        return _local_map_result(location, match)
     
     # Try case-insensitive lookup
-    location_lower = location_normalized.lower()
-    for city, coords in CITY_COORDINATES.items():
-        if city.lower() == location_lower:
-            lat, lon = coords
-            return {
-                'success': True,
-                'data': {
-                    'location': location,
-                    'latitude': lat,
-                    'longitude': lon,
-                    'display_name': city,
-                    'source': 'local_map'
-                }
-            }
+    location_lower = location.lower()
+    match = _CITY_LOWER.get(location_lower)
+    if match is not None:
+        return _local_map_result(location, match)
+    
+    # Try city name without the state (e.g., "Manhattan" matches "Manhattan, NY")
+    match = _CITY_NAME_ONLY.get(location_lower)
+    if match is not None:
+        return _local_map_result(location, match)
+    
+    # Try prefix match in either direction
+    match = _city_prefix_match(location_lower)
+    if match is not None:
+        return _local_map_result(location, match)
     
-    # Try partial match (e.g., "Manhattan" matches "Manhattan, NY")
-    for city, coords in CITY_COORDINATES.items():
-        city_name = city.split(',')[0].strip().lower()
-        if location_lower == city_name or location_lower in city.lower() or city.lower() in location_lower:
-            lat, lon = coords
+    # Try matching whole words against the token index
+    match = _city_token_match(location_lower)
+    if match is not None:
+        return _local_map_result(location, match)
+    
+    # Try partial match in either direction
+    for city_lower, i in _CITY_LOWER.items():
+        if location_lower in city_lower or city_lower in location_lower:
+            return _local_map_result(location, i)
+    
+    # Coordinates need no geocoding; label them with the nearest known city
+    coords = _COORDINATES_RE.match(location)
+    if coords:
+        lat, lon = float(coords.group(1)), float(coords.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            nearest = _nearest_known_city(lat, lon)
             return {
                 'success': True,
                 'data': {
                     'location': location,
                     'latitude': lat,
                     'longitude': lon,
-                    'display_name': city,
-                    'source': 'local_map'
+                    'display_name': nearest[0] if nearest else location,
+                    'source': 'coordinates'
                 }
             }
     
     # Fall back to Nominatim API if not found in local map
     try:
-        url = 'https://nominatim.openstreetmap.org/search'
-        params = {
-            'q': location,
-            'format': 'json',
-            'limit': 1
-        }
-        headers = {
-            'User-Agent': 'MinyanFinder/1.0'  # Required by Nominatim
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        results = response.json()
-        if not results:
+        match = _geocode_cached(location.casefold())
+        if match is None:
             return {
                 'success': False,
                 'error': f'Location "{location}" not found'
             }
         
-        result = results[0]
+        lat, lon, display_name = match
         return {
             'success': True,
             'data': {
                 'location': location,
-                'latitude': float(result['lat']),
-                'longitude': float(result['lon']),
-                'display_name': result.get('display_name', location),
+                'latitude': lat,
+                'longitude': lon,
+                'display_name': display_name or location,
                 'source': 'nominatim_api'
             }
         }
@@ -445,18 +725,20 @@ def handle_geocode_location(args: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
+# Function name -> handler, built once rather than on every call
+_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    'createBroadcast': handle_create_broadcast,
+    'findNearbyBroadcasts': handle_find_nearby_broadcasts,
+    'geocodeLocation': handle_geocode_location
+}
+
+
 def execute_function(function_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Execute a function call by name.
     Routes to the appropriate handler.
     """
-    handlers = {
-        'createBroadcast': handle_create_broadcast,
-        'findNearbyBroadcasts': handle_find_nearby_broadcasts,
-        'geocodeLocation': handle_geocode_location
-    }
-    
-    handler = handlers.get(function_name)
+    handler = _HANDLERS.get(function_name)
     if not handler:
         return {
             'success': False,
@@ -466,11 +748,34 @@ def execute_function(function_name: str, args: Dict[str, Any]) -> Dict[str, Any]
     return handler(args)
 
 
+def execute_functions_batch(calls: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Execute several independent function calls, returning results in call order.
+    The handlers are network-bound, so multiple calls run concurrently on the shared
+    thread pool and share the pooled _SESSION.
+    """
+    if len(calls) <= 1:
+        return [execute_function(name, args) for name, args in calls]
+    
+    return list(_FUNCTION_EXECUTOR.map(lambda call: execute_function(*call), calls))
+
+
+@functools.lru_cache(maxsize=1)
 def get_gemini_functions() -> List[Dict[str, Any]]:
     """
-    Get Gemini function declarations from OpenAPI spec.
+    Get Gemini function declarations.
     Main entry point for getting functions.
+    Uses the declarations pregenerated by tools/gen_functions.py, falling back to
+    converting openapi.yaml at runtime when GEMINI_FUNCTIONS_FROM_SPEC is set or
+    the generated module is missing. The result is computed once per process.
     """
+    if not GEMINI_FUNCTIONS_FROM_SPEC:
+        try:
+            from generated_functions import GEMINI_FUNCTIONS
+            return GEMINI_FUNCTIONS
+        except ImportError:
+            pass
+    
     openapi_spec = load_openapi_spec()
     functions = convert_openapi_to_gemini_functions(openapi_spec)
     
@@ -478,4 +783,3 @@ def get_gemini_functions() -> List[Dict[str, Any]]:
     # The handle_geocode_location function is kept as a backend utility but not exposed to Gemini
     
     return functions
-
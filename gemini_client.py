@@ -3,82 +3,255 @@ Gemini API client with function calling support.
 Handles the interaction between user prompts, Gemini, and function calls.
 """
 import google.generativeai as genai
+import io
 import sys
-from typing import List, Dict, Any, Optional
-from config import GEMINI_API_KEY, GEMINI_MODEL
-from functions import get_gemini_functions, execute_function
+from collections import deque
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Iterator, Optional
+from config import (GEMINI_API_KEY, GEMINI_MODEL, HISTORY_MAX_TURNS, HISTORY_TOKEN_BUDGET,
+                    MINYAN_API_BASE_URL)
+from functions import get_gemini_functions, execute_functions_batch
+
+try:
+    from google.protobuf.json_format import MessageToDict
+    from google.protobuf.message import Message as ProtobufMessage
+except ImportError:
+    MessageToDict = None
+    ProtobufMessage = None
+
+# API base URL, resolved once for the verbose request trace
+_BASE_URL = MINYAN_API_BASE_URL
+
+# Fold old exchanges into the summary once history exceeds this share of the budget
+HISTORY_SUMMARIZE_THRESHOLD = 0.8
+# Number of oldest exchanges folded into the summary at a time
+HISTORY_SUMMARIZE_BATCH = 5
+
+
+def _estimate_tokens(entry: Dict[str, Any]) -> int:
+    """Rough token estimate for a history entry using the chars / 4 heuristic."""
+    chars = (len(entry.get('user_message') or '') +
+             len(entry.get('final_response') or '') +
+             len(str(entry.get('function_calls', []))) +
+             len(str(entry.get('api_responses', []))))
+    return chars // 4
+
+
+def _to_plain(value: Any) -> Any:
+    """Recursively convert proto-plus map/repeated containers into dicts and lists."""
+    if isinstance(value, Mapping):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+def _attrs_to_dict(args_obj: Any) -> Dict[str, Any]:
+    """Fallback conversion for plain objects: their public attributes, else dict()."""
+    if hasattr(args_obj, '__dict__'):
+        return {k: v for k, v in args_obj.__dict__.items() if not k.startswith('_')}
+    try:
+        return dict(args_obj)
+    except (TypeError, ValueError):
+        return {}
+
+
+# Converters for function_call.args, checked in order. The SDK normally hands back
+# a proto-plus MapComposite (a Mapping); raw protobuf Structs go through MessageToDict.
+_ARG_CONVERTERS: List[tuple] = [
+    (dict, lambda args_obj: args_obj),
+    (Mapping, _to_plain),
+]
+if ProtobufMessage is not None:
+    _ARG_CONVERTERS.append(
+        (ProtobufMessage, lambda args_obj: MessageToDict(args_obj, preserving_proto_field_name=True)))
+
+# Converter chosen per concrete args type, so the isinstance checks run once per type
+_ARG_CONVERTER_BY_TYPE: Dict[type, Callable[[Any], Dict[str, Any]]] = {}
+
+
+def _args_to_dict(args_obj: Any) -> Dict[str, Any]:
+    """Convert function_call.args (dict, proto-plus map, protobuf Struct, ...) to a dictionary."""
+    if not args_obj:
+        return {}
+    converter = _ARG_CONVERTER_BY_TYPE.get(type(args_obj))
+    if converter is None:
+        converter = next((fn for cls, fn in _ARG_CONVERTERS if isinstance(args_obj, cls)),
+                         _attrs_to_dict)
+        _ARG_CONVERTER_BY_TYPE[type(args_obj)] = converter
+    return converter(args_obj)
+
+
+def _flush_trace(trace: Optional[io.StringIO]):
+    """Write buffered verbose output to stdout in a single call and empty the buffer."""
+    if trace is None or not trace.tell():
+        return
+    sys.stdout.write(trace.getvalue())
+    sys.stdout.flush()
+    trace.seek(0)
+    trace.truncate()
+
+
+def _extract_function_calls(response: Any) -> List[Any]:
+    """Return the function_call objects in the first candidate of a response (possibly empty)."""
+    candidates = getattr(response, 'candidates', None)
+    if not candidates:
+        return []
+    parts = getattr(getattr(candidates[0], 'content', None), 'parts', None) or []
+    return [part.function_call for part in parts if getattr(part, 'function_call', None)]
+
+
+@lru_cache(maxsize=1)
+def _get_model() -> Any:
+    """
+    Configure the SDK and build the GenerativeModel once per process.
+    The model (and its serialized tool declarations) is shared by every client;
+    per-conversation state lives in the chat session from start_chat().
+    """
+    genai.configure(api_key=GEMINI_API_KEY)
+    
+    # Try different model name formats if needed
+    model_name = GEMINI_MODEL
+    # Remove 'models/' prefix if present, as it's added automatically
+    if model_name.startswith('models/'):
+        model_name = model_name.replace('models/', '')
+    
+    # List available models for debugging
+    try:
+        available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+        print(f"Available models with generateContent: {available_models}", file=sys.stderr)
+    except Exception as e:
+        print(f"Could not list models: {e}", file=sys.stderr)
+    
+    # Try model names in order of preference
+    model_names_to_try = [
+        model_name,  # Try the configured model first
+        'gemini-2.5-flash',  # Latest flash model
+        'gemini-2.5-pro',  # Latest pro model
+        'gemini-pro',  # Most basic model name
+        'gemini-1.5-pro-latest',
+        'gemini-1.5-flash-latest',
+        'models/gemini-2.5-flash',  # Try with models/ prefix
+        'models/gemini-pro',
+        'models/gemini-1.5-pro',
+        'models/gemini-1.5-flash'
+    ]
+    
+    # Remove duplicates while preserving order
+    seen = set()
+    unique_models = []
+    for m in model_names_to_try:
+        if m not in seen:
+            seen.add(m)
+            unique_models.append(m)
+    
+    last_error = None
+    for try_model in unique_models:
+        try:
+            print(f"Trying model: {try_model}", file=sys.stderr)
+            model = genai.GenerativeModel(
+                model_name=try_model,
+                tools=[{"function_declarations": get_gemini_functions()}]
+            )
+            # Test if model actually works by checking if it has the method
+            print(f"Successfully initialized model: {try_model}", file=sys.stderr)
+            break
+        except Exception as e:
+            last_error = e
+            print(f"Failed to initialize {try_model}: {str(e)}", file=sys.stderr)
+            continue
+    else:
+        # If all models failed, raise the last error
+        error_msg = f"Failed to initialize any Gemini model. Last error: {last_error}"
+        print(error_msg, file=sys.stderr)
+        raise Exception(error_msg)
+    
+    return model
+
+
+def warm_up() -> None:
+    """
+    Open the connection to Gemini ahead of the first turn with a cheap count_tokens call.
+    The SDK keeps one long-lived gRPC (HTTP/2) channel per process, so every later
+    send_message reuses it instead of paying the TCP + TLS handshake. Failures are
+    ignored; the first real request simply connects as usual.
+    """
+    try:
+        _get_model().count_tokens('ping')
+    except Exception as e:
+        print(f"Could not warm up Gemini connection: {e}", file=sys.stderr)
 
 
 class GeminiFunctionCallingClient:
     """Client for interacting with Gemini API with function calling."""
     
     def __init__(self):
-        """Initialize the Gemini client with API key and model."""
-        genai.configure(api_key=GEMINI_API_KEY)
-        
-        # Try different model name formats if needed
-        model_name = GEMINI_MODEL
-        # Remove 'models/' prefix if present, as it's added automatically
-        if model_name.startswith('models/'):
-            model_name = model_name.replace('models/', '')
-        
-        # List available models for debugging
-        try:
-            available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-            print(f"Available models with generateContent: {available_models}", file=sys.stderr)
-        except Exception as e:
-            print(f"Could not list models: {e}", file=sys.stderr)
-        
-        # Try model names in order of preference
-        model_names_to_try = [
-            model_name,  # Try the configured model first
-            'gemini-2.5-flash',  # Latest flash model
-            'gemini-2.5-pro',  # Latest pro model
-            'gemini-pro',  # Most basic model name
-            'gemini-1.5-pro-latest',
-            'gemini-1.5-flash-latest',
-            'models/gemini-2.5-flash',  # Try with models/ prefix
-            'models/gemini-pro',
-            'models/gemini-1.5-pro',
-            'models/gemini-1.5-flash'
-        ]
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_models = []
-        for m in model_names_to_try:
-            if m not in seen:
-                seen.add(m)
-                unique_models.append(m)
-        
-        last_error = None
-        for try_model in unique_models:
-            try:
-                print(f"Trying model: {try_model}", file=sys.stderr)
-                self.model = genai.GenerativeModel(
-                    model_name=try_model,
-                    tools=[{"function_declarations": get_gemini_functions()}]
-                )
-                # Test if model actually works by checking if it has the method
-                print(f"Successfully initialized model: {try_model}", file=sys.stderr)
-                break
-            except Exception as e:
-                last_error = e
-                print(f"Failed to initialize {try_model}: {str(e)}", file=sys.stderr)
-                continue
-        else:
-            # If all models failed, raise the last error
-            error_msg = f"Failed to initialize any Gemini model. Last error: {last_error}"
-            print(error_msg, file=sys.stderr)
-            raise Exception(error_msg)
-        
+        """Initialize the Gemini client with the shared, pre-built model."""
+        self.model = _get_model()
         self.chat = None
-        self.conversation_history = []
+        self._reset_history()
     
     def start_chat(self):
-        """Start a new chat session."""
+        """
+        Start a new chat session.
+        The ChatSession keeps the transcript client-side and re-sends all of it on
+        every turn (the API is stateless). It is only ever appended to, never
+        rewritten, so the prefix stays stable and implicit prefix caching can apply.
+        conversation_history is a separate local log and is never added to a request.
+        """
         self.chat = self.model.start_chat(enable_automatic_function_calling=False)
-        self.conversation_history = []
+        self._reset_history()
+    
+    def _reset_history(self):
+        """Clear the bounded conversation history and its summary."""
+        self.conversation_history = deque(maxlen=HISTORY_MAX_TURNS)
+        self.summary_head = None
+        self._history_tokens = 0
+    
+    def add_to_history(self, flow_info: Dict[str, Any]):
+        """
+        Record an exchange in the conversation history.
+        Keeps memory bounded by folding the oldest exchanges into summary_head
+        when the turn limit or the token budget is reached.
+        """
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            self._fold_oldest(1)
+        
+        self.conversation_history.append(flow_info)
+        self._history_tokens += _estimate_tokens(flow_info)
+        
+        threshold = HISTORY_TOKEN_BUDGET * HISTORY_SUMMARIZE_THRESHOLD
+        while self._history_tokens > threshold and len(self.conversation_history) > 1:
+            self._fold_oldest(min(HISTORY_SUMMARIZE_BATCH, len(self.conversation_history) - 1))
+    
+    def get_history(self) -> List[Dict[str, Any]]:
+        """Snapshot of the verbatim history (oldest first) as a list, for indexing or serializing."""
+        return list(self.conversation_history)
+    
+    def _fold_oldest(self, count: int):
+        """Pop the oldest exchanges and merge them into a heuristic summary (no LLM call)."""
+        head = self.summary_head or {
+            'summary': '',
+            'exchanges': 0,
+            'function_calls_count': 0,
+            'functions': {},
+            'last_user_message': None
+        }
+        
+        for _ in range(count):
+            entry = self.conversation_history.popleft()
+            self._history_tokens -= _estimate_tokens(entry)
+            head['exchanges'] += 1
+            for fc in entry['function_calls']:
+                head['function_calls_count'] += 1
+                head['functions'][fc['name']] = head['functions'].get(fc['name'], 0) + 1
+            head['last_user_message'] = entry['user_message'][:100]
+        
+        calls = ', '.join(f"{name} x{n}" for name, n in head['functions'].items()) or 'none'
+        head['summary'] = (f"{head['exchanges']} earlier exchanges summarized; "
+                           f"function calls: {calls}")
+        self.summary_head = head
     
     def send_message(self, user_message: str, verbose: bool = True) -> Dict[str, Any]:
         """
@@ -91,13 +264,64 @@ class GeminiFunctionCallingClient:
         Returns:
             Dictionary containing the response and flow information
         """
+        for event in self.stream_message(user_message, verbose=verbose):
+            if event['type'] == 'done':
+                return event['flow_info']
+    
+    def stream_message(self, user_message: str, verbose: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Send a message to Gemini and handle function calls, yielding progress events.
+        
+        Events are dictionaries with a 'type' key:
+            tool_call: a function call requested by Gemini ('name', 'arguments')
+            tool_result: the result of a function call ('name', 'success', 'data', 'error')
+            done: the turn is complete ('flow_info' holds the same dictionary send_message returns)
+        
+        Args:
+            user_message: The user's message/prompt
+            verbose: Whether to print detailed information about the flow
+        """
         if not self.chat:
             self.start_chat()
         
+        history_len = len(self.chat.history)
+        completed = False
+        turn = self._stream_turn(user_message, verbose)
+        try:
+            for event in turn:
+                completed = event['type'] == 'done'
+                yield event
+        except BaseException:
+            # Abandoned mid-turn (the consumer closed us, e.g. an SSE client went
+            # away, or a call failed): the session may end in a function_call with
+            # no function_response, which Gemini rejects on every later turn
+            if not completed:
+                self._rollback_chat(history_len)
+            raise
+        finally:
+            turn.close()
+    
+    def _rollback_chat(self, history_len: int):
+        """Drop everything the current turn added to the chat session's history."""
+        try:
+            history = self.chat.history
+        except Exception:
+            # The last response can't be folded into the history; discard it
+            self.chat.rewind()
+            history = self.chat.history
+        self.chat.history = history[:history_len]
+    
+    def _stream_turn(self, user_message: str, verbose: bool) -> Iterator[Dict[str, Any]]:
+        """Run one turn, yielding the events described in stream_message()."""
+        # Verbose trace lines are buffered and written out in one call before each
+        # wait on the network, rather than one write (and flush) per print
+        trace = io.StringIO() if verbose else None
+        
         if verbose:
-            print(f"\n{'='*60}")
-            print(f"USER: {user_message}")
-            print(f"{'='*60}\n")
+            print(f"\n{'='*60}", file=trace)
+            print(f"USER: {user_message}", file=trace)
+            print(f"{'='*60}\n", file=trace)
+            _flush_trace(trace)
         
         # Send message to Gemini
         response = self.chat.send_message(user_message)
@@ -110,140 +334,131 @@ class GeminiFunctionCallingClient:
         }
         
         # Handle function calls if present
-        # Check if response contains function calls
-        while (hasattr(response, 'candidates') and 
-               len(response.candidates) > 0 and
-               hasattr(response.candidates[0], 'content') and
-               hasattr(response.candidates[0].content, 'parts') and
-               len(response.candidates[0].content.parts) > 0 and
-               hasattr(response.candidates[0].content.parts[0], 'function_call') and
-               response.candidates[0].content.parts[0].function_call):
-            
-            function_call = response.candidates[0].content.parts[0].function_call
-            function_name = function_call.name
-            # Convert function_call.args to dictionary
-            # The args can be a dict, protobuf Struct, or other format
-            function_args = {}
-            if hasattr(function_call, 'args') and function_call.args:
-                args_obj = function_call.args
-                # Handle different arg formats
-                if isinstance(args_obj, dict):
-                    function_args = args_obj
-                elif hasattr(args_obj, '__dict__'):
-                    function_args = {k: v for k, v in args_obj.__dict__.items() 
-                                   if not k.startswith('_')}
-                else:
-                    # Try protobuf conversion if available
-                    try:
-                        from google.protobuf.json_format import MessageToDict
-                        if hasattr(args_obj, 'SerializeToString'):
-                            function_args = MessageToDict(args_obj, preserving_proto_field_name=True)
-                    except (ImportError, AttributeError):
-                        # Fallback: try direct conversion
-                        try:
-                            function_args = dict(args_obj) if args_obj else {}
-                        except (TypeError, ValueError):
-                            function_args = {}
-            
-            if verbose:
-                print(f"🔧 GEMINI FUNCTION CALL:")
-                print(f"   Function: {function_name}")
-                print(f"   Arguments: {function_args}\n")
+        # A single response may contain several independent function calls
+        while True:
+            function_calls = _extract_function_calls(response)
+            if not function_calls:
+                break
             
-            flow_info['function_calls'].append({
-                'name': function_name,
-                'arguments': function_args
-            })
+            calls = []
+            for function_call in function_calls:
+                function_name = function_call.name
+                # Convert function_call.args to dictionary
+                # The args can be a dict, protobuf Struct, or other format
+                function_args = _args_to_dict(getattr(function_call, 'args', None))
+                
+                if verbose:
+                    print(f"🔧 GEMINI FUNCTION CALL:", file=trace)
+                    print(f"   Function: {function_name}", file=trace)
+                    print(f"   Arguments: {function_args}\n", file=trace)
+                
+                flow_info['function_calls'].append({
+                    'name': function_name,
+                    'arguments': function_args
+                })
+                calls.append((function_name, function_args))
+                yield {'type': 'tool_call', 'name': function_name, 'arguments': function_args}
             
-            # Execute the function
-            function_result = execute_function(function_name, function_args)
+            _flush_trace(trace)
             
-            if verbose:
-                print(f"📡 API REQUEST:")
-                if function_name == 'createBroadcast':
-                    print(f"   POST {self._get_api_url('/broadcasts')}")
-                    print(f"   Body: {function_args}\n")
-                elif function_name == 'findNearbyBroadcasts':
-                    print(f"   GET {self._get_api_url('/broadcasts/nearby')}")
-                    print(f"   Query Params: {function_args}\n")
+            # Execute the functions (concurrently when there is more than one)
+            function_results = execute_functions_batch(calls)
             
-            if verbose:
-                print(f"📥 API RESPONSE:")
+            function_responses = []
+            for (function_name, function_args), function_result in zip(calls, function_results):
+                if verbose:
+                    print("📡 API REQUEST:", file=trace)
+                    if function_name == 'createBroadcast':
+                        print("   POST", self._get_api_url('/broadcasts'), file=trace)
+                        print("   Body:", function_args, end='\n\n', file=trace)
+                    elif function_name == 'findNearbyBroadcasts':
+                        print("   GET", self._get_api_url('/broadcasts/nearby'), file=trace)
+                        print("   Query Params:", function_args, end='\n\n', file=trace)
+                    
+                    print("📥 API RESPONSE:", file=trace)
+                    if function_result['success']:
+                        print("   Status: Success", file=trace)
+                        print("   Data:", function_result['data'], end='\n\n', file=trace)
+                    else:
+                        print("   Status: Error", file=trace)
+                        print("   Error:", function_result.get('error', 'Unknown error'), end='\n\n', file=trace)
+                
+                api_response = {
+                    'function_name': function_name,
+                    'success': function_result['success'],
+                    'data': function_result.get('data'),
+                    'error': function_result.get('error')
+                }
+                flow_info['api_responses'].append(api_response)
+                yield {'type': 'tool_result', **api_response}
+                
+                # Create function response for Gemini
+                # Format: dictionary with function_response containing name and response
                 if function_result['success']:
-                    print(f"   Status: Success")
-                    print(f"   Data: {function_result['data']}\n")
+                    function_responses.append({
+                        'function_response': {
+                            'name': function_name,
+                            'response': function_result.get('data')
+                        }
+                    })
                 else:
-                    print(f"   Status: Error")
-                    print(f"   Error: {function_result.get('error', 'Unknown error')}\n")
-            
-            flow_info['api_responses'].append({
-                'function_name': function_name,
-                'success': function_result['success'],
-                'data': function_result.get('data'),
-                'error': function_result.get('error')
-            })
-            
-            # Create function response for Gemini
-            # Format: dictionary with function_response containing name and response
-            if function_result['success']:
-                function_response_data = {
-                    'function_response': {
-                        'name': function_name,
-                        'response': function_result.get('data')
-                    }
-                }
-            else:
-                function_response_data = {
-                    'function_response': {
-                        'name': function_name,
-                        'response': {
-                            'error': function_result.get('error', 'Unknown error')
+                    function_responses.append({
+                        'function_response': {
+                            'name': function_name,
+                            'response': {
+                                'error': function_result.get('error', 'Unknown error')
+                            }
                         }
-                    }
-                }
+                    })
+            
+            _flush_trace(trace)
             
-            # Send function response back to Gemini
-            # Just send the function response as a dict, not the original content object
-            response = self.chat.send_message(function_response_data)
+            # Send all function responses back to Gemini in a single turn
+            # Just send the function responses as dicts, not the original content objects
+            response = self.chat.send_message(function_responses)
         
         # Get final text response
         final_text = response.text if hasattr(response, 'text') else str(response)
         
         if verbose:
-            print(f"💬 GEMINI FINAL RESPONSE:")
-            print(f"   {final_text}\n")
-            print(f"{'='*60}\n")
+            print(f"💬 GEMINI FINAL RESPONSE:", file=trace)
+            print(f"   {final_text}\n", file=trace)
+            print(f"{'='*60}\n", file=trace)
+            _flush_trace(trace)
         
         flow_info['final_response'] = final_text
         
-        return flow_info
+        yield {'type': 'done', 'flow_info': flow_info}
     
     def _get_api_url(self, endpoint: str) -> str:
         """Get full API URL for an endpoint."""
-        from config import MINYAN_API_BASE_URL
-        return f"{MINYAN_API_BASE_URL}{endpoint}"
+        return f"{_BASE_URL}{endpoint}"
     
     def get_conversation_summary(self) -> str:
         """Get a summary of the conversation flow."""
-        summary = "Conversation Flow Summary:\n"
-        summary += "=" * 60 + "\n\n"
+        parts: List[str] = []
+        append = parts.append
+        append("Conversation Flow Summary:\n")
+        append("=" * 60 + "\n\n")
+        
+        if self.summary_head:
+            append(f"Earlier: {self.summary_head['summary']}\n\n")
         
         for i, entry in enumerate(self.conversation_history, 1):
-            summary += f"Exchange {i}:\n"
-            summary += f"  User: {entry['user_message']}\n"
+            append(f"Exchange {i}:\n")
+            append(f"  User: {entry['user_message']}\n")
             
             if entry['function_calls']:
-                summary += f"  Function Calls:\n"
+                append(f"  Function Calls:\n")
                 for fc in entry['function_calls']:
-                    summary += f"    - {fc['name']}({fc['arguments']})\n"
+                    append(f"    - {fc['name']}({fc['arguments']})\n")
             
             if entry['api_responses']:
-                summary += f"  API Responses:\n"
+                append(f"  API Responses:\n")
                 for ar in entry['api_responses']:
                     status = "✓ Success" if ar['success'] else "✗ Error"
-                    summary += f"    - {ar['function_name']}: {status}\n"
+                    append(f"    - {ar['function_name']}: {status}\n")
             
-            summary += f"  Gemini: {entry['final_response'][:100]}...\n\n"
+            append(f"  Gemini: {entry['final_response'][:100]}...\n\n")
         
-        return summary
-
+        return ''.join(parts)
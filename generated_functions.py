@@ -0,0 +1,74 @@
+"""
+Gemini function declarations generated from openapi.yaml.
+Do not edit by hand - regenerate with:
+
+    python -m tools.gen_functions openapi.yaml > generated_functions.py
+"""
+
+GEMINI_FUNCTIONS = [
+    {
+        'name': 'createBroadcast',
+        'description': 'A user broadcasts that they are looking for a minyan at a specific location and time.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'latitude': {
+                    'type': 'number',
+                    'description': 'Latitude coordinate (Constraints: minimum: -90, maximum: 90)',
+                    'format': 'float',
+                },
+                'longitude': {
+                    'type': 'number',
+                    'description': 'Longitude coordinate (Constraints: minimum: -180, maximum: 180)',
+                    'format': 'float',
+                },
+                'minyanType': {
+                    'type': 'string',
+                    'description': 'Type of minyan needed',
+                    'enum': ['shacharit', 'mincha', 'maariv'],
+                },
+                'earliestTime': {
+                    'type': 'string',
+                    'description': 'Earliest time for the minyan (ISO 8601 UTC)',
+                    'format': 'date-time',
+                },
+                'latestTime': {
+                    'type': 'string',
+                    'description': 'Latest time for the minyan (ISO 8601 UTC)',
+                    'format': 'date-time',
+                },
+            },
+            'required': ['latitude', 'longitude', 'minyanType', 'earliestTime', 'latestTime'],
+        },
+    },
+    {
+        'name': 'findNearbyBroadcasts',
+        'description': 'Find people near you who need the same minyan. Returns broadcasts within the specified radius.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'latitude': {
+                    'type': 'number',
+                    'description': 'Latitude of the search location (Constraints: minimum: -90, maximum: 90)',
+                    'format': 'float',
+                },
+                'longitude': {
+                    'type': 'number',
+                    'description': 'Longitude of the search location (Constraints: minimum: -180, maximum: 180)',
+                    'format': 'float',
+                },
+                'radius': {
+                    'type': 'number',
+                    'description': 'Search radius in miles (Constraints: minimum: 0)',
+                    'format': 'float',
+                },
+                'minyanType': {
+                    'type': 'string',
+                    'description': 'Filter by minyan type (shacharit, mincha, maariv)',
+                    'enum': ['shacharit', 'mincha', 'maariv'],
+                },
+            },
+            'required': ['latitude', 'longitude', 'radius'],
+        },
+    },
+]
@@ -0,0 +1,136 @@
+"""
+Geospatial helpers for the local city coordinates map.
+Provides great-circle distances and a geohash-bucketed index for
+nearest-known-city lookups without scanning every entry.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+EARTH_RADIUS_MILES = 3958.8
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Project a coordinate onto the unit sphere (earth-centered x, y, z)."""
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _dot_to_miles(dot: float) -> float:
+    """Great-circle distance in miles between two unit vectors with the given dot product."""
+    # Half the chord length is sin(angle / 2); asin of it is better conditioned than acos(dot)
+    half_chord = math.sqrt(max(0.0, 2.0 - 2.0 * dot)) / 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(half_chord, 1.0))
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    """Encode a coordinate as a base-32 geohash string of the given length."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    value = 0
+    bits = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude (even) and latitude (odd)
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value *= 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value *= 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[value])
+            value = 0
+            bits = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Return the (height, width) in degrees of a geohash cell at the given precision."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+class GeohashIndex:
+    """
+    Buckets named points by geohash prefix at one or more precisions.
+    A nearest-point query probes the query's cell plus its 8 neighbors, starting
+    at the finest precision and widening only when the match found there could
+    be beaten by a point outside those cells.
+    """
+
+    def __init__(self, points: Dict[str, Tuple[float, float]], precisions: Tuple[int, ...] = (5, 3)):
+        self.precisions = tuple(sorted(precisions, reverse=True))
+        # Entries carry (name, x, y, z) on the unit sphere: chord length is monotonic in
+        # great-circle distance, so candidates are ranked by a dot product with no trig
+        entries = [(name, lat, lon, (name,) + unit_vector(lat, lon))
+                   for name, (lat, lon) in points.items()]
+        self._all = [entry for _, _, _, entry in entries]
+        self._buckets: Dict[int, Dict[str, List[Tuple[str, float, float, float]]]] = {}
+        for precision in self.precisions:
+            buckets = defaultdict(list)
+            for name, lat, lon, entry in entries:
+                buckets[geohash_encode(lat, lon, precision)].append(entry)
+            self._buckets[precision] = dict(buckets)
+
+    def _neighborhood(self, lat: float, lon: float, precision: int) -> List[str]:
+        """Geohashes of the cell containing the point and its 8 neighbors."""
+        height, width = geohash_cell_size(precision)
+        cells = []
+        for dlat in (-height, 0.0, height):
+            for dlon in (-width, 0.0, width):
+                nlat = min(max(lat + dlat, -90.0), 90.0)
+                nlon = (lon + dlon + 180.0) % 360.0 - 180.0
+                cell = geohash_encode(nlat, nlon, precision)
+                if cell not in cells:
+                    cells.append(cell)
+        return cells
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[str, float]]:
+        """Return (name, distance in miles) of the closest indexed point, or None if none is nearby."""
+        qx, qy, qz = unit_vector(lat, lon)
+        best_name, best_dot = None, -2.0
+        for precision in self.precisions:
+            buckets = self._buckets[precision]
+            for cell in self._neighborhood(lat, lon, precision):
+                for name, x, y, z in buckets.get(cell, ()):
+                    dot = qx * x + qy * y + qz * z
+                    if dot > best_dot:
+                        best_name, best_dot = name, dot
+            # Anything closer than one cell span is guaranteed to be in the 3x3 block;
+            # otherwise widen to the next (coarser) precision
+            if best_name is not None and _dot_to_miles(best_dot) <= self._covered_radius(lat, precision):
+                return best_name, _dot_to_miles(best_dot)
+        if best_name is None:
+            return None
+        # Even the coarsest block can't rule out a closer point, so settle it exactly
+        for name, x, y, z in self._all:
+            dot = qx * x + qy * y + qz * z
+            if dot > best_dot:
+                best_name, best_dot = name, dot
+        return best_name, _dot_to_miles(best_dot)
+
+    @staticmethod
+    def _covered_radius(lat: float, precision: int) -> float:
+        """Radius in miles fully covered by the 3x3 block of cells around a point."""
+        height, width = geohash_cell_size(precision)
+        miles_per_degree = math.pi * EARTH_RADIUS_MILES / 180
+        return min(height, width * math.cos(math.radians(lat))) * miles_per_degree
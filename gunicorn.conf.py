@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for the Gemini Function Calling web wrapper.
+Used automatically when running `gunicorn app:app` from the project root.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+
+# A single worker keeps one shared chat session; threads let /health and the UI
+# stay responsive while a /chat request is blocked on Gemini or the Minyan API
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Multi-step function calling flows can take a while
+timeout = 120
+
+# Don't preload: app.py warms its HTTP connection pool on import, and that pool
+# must be created inside each worker rather than inherited across the fork
+preload_app = False
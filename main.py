@@ -2,75 +2,146 @@
 Main entry point for Gemini Function Calling demonstration.
 Interactive CLI that demonstrates complete request/response flow.
 """
+import argparse
 import sys
-from gemini_client import GeminiFunctionCallingClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# gemini_client (the Gemini SDK and gRPC), google.api_core and prompt_toolkit are
+# imported inside the functions that use them, so --help starts without loading them
+
+# Command history for the interactive demo, kept between runs
+HISTORY_FILE = '.minyan_history'
+
+# Scripted prompts shared by the --examples and --batch demos
+EXAMPLES = [
+    {
+        'prompt': "I need a mincha minyan at 40.7128, -74.0060. The earliest time is 2025-03-26T13:00:00Z and latest is 2025-03-26T14:00:00Z",
+        'description': "Example 1: Creating a broadcast"
+    },
+    {
+        'prompt': "Find nearby mincha minyans within 2 miles of latitude 40.7130 and longitude -74.0059",
+        'description': "Example 2: Finding nearby broadcasts"
+    }
+]
+
+# Retries for a rate-limited (429 RESOURCE_EXHAUSTED) batch example
+BATCH_MAX_ATTEMPTS = 3
+BATCH_BACKOFF_BASE_SECONDS = 1.0
+
+
+# Static banners, built once at import and written with a single call
+_RULE = "=" * 60
+
+_WELCOME = (
+    f"\n{_RULE}\n"
+    "  Gemini Function Calling - Minyan Finder API Demo\n"
+    f"{_RULE}\n"
+    "\nThis demo shows how Gemini can call your API functions.\n"
+    "You can interact naturally, and Gemini will use function calling\n"
+    "to interact with the Minyan Finder API.\n\n"
+    "Example prompts:\n"
+    "  - 'I need a mincha minyan at 40.7128, -74.0060 between 1pm and 2pm today'\n"
+    "  - 'Find nearby mincha minyans within 2 miles of 40.7130, -74.0059'\n"
+    "  - 'Create a broadcast for shacharit at 34.0522, -118.2437'\n"
+    "\nType 'quit' or 'exit' to end the session.\n"
+    "Type 'examples' to see example prompts.\n"
+    f"{_RULE}\n\n"
+)
+
+_EXAMPLES_TEXT = (
+    f"\n{_RULE}\n"
+    "Example Prompts:\n"
+    f"{_RULE}\n"
+    "\n1. Create Broadcast:\n"
+    "   'I need a mincha minyan at 40.7128, -74.0060'\n"
+    "   'Create a broadcast for maariv at latitude 34.0522, longitude -118.2437'\n"
+    "   'I'm looking for a shacharit minyan at 40.7580, -73.9855'\n"
+    "\n2. Find Nearby Broadcasts:\n"
+    "   'Find nearby mincha minyans within 2 miles'\n"
+    "   'Search for minyans near 40.7130, -74.0059'\n"
+    "   'Are there any shacharit minyans nearby?'\n"
+    "\n3. Combined:\n"
+    "   'I need a mincha minyan. Can you create one and then find others nearby?'\n"
+    f"{_RULE}\n\n"
+)
 
 
 def print_welcome():
     """Print welcome message and instructions."""
-    print("\n" + "="*60)
-    print("  Gemini Function Calling - Minyan Finder API Demo")
-    print("="*60)
-    print("\nThis demo shows how Gemini can call your API functions.")
-    print("You can interact naturally, and Gemini will use function calling")
-    print("to interact with the Minyan Finder API.\n")
-    print("Example prompts:")
-    print("  - 'I need a mincha minyan at 40.7128, -74.0060 between 1pm and 2pm today'")
-    print("  - 'Find nearby mincha minyans within 2 miles of 40.7130, -74.0059'")
-    print("  - 'Create a broadcast for shacharit at 34.0522, -118.2437'")
-    print("\nType 'quit' or 'exit' to end the session.")
-    print("Type 'examples' to see example prompts.")
-    print("="*60 + "\n")
+    sys.stdout.write(_WELCOME)
 
 
 def print_examples():
     """Print example prompts."""
-    print("\n" + "="*60)
-    print("Example Prompts:")
-    print("="*60)
-    print("\n1. Create Broadcast:")
-    print("   'I need a mincha minyan at 40.7128, -74.0060'")
-    print("   'Create a broadcast for maariv at latitude 34.0522, longitude -118.2437'")
-    print("   'I'm looking for a shacharit minyan at 40.7580, -73.9855'")
-    print("\n2. Find Nearby Broadcasts:")
-    print("   'Find nearby mincha minyans within 2 miles'")
-    print("   'Search for minyans near 40.7130, -74.0059'")
-    print("   'Are there any shacharit minyans nearby?'")
-    print("\n3. Combined:")
-    print("   'I need a mincha minyan. Can you create one and then find others nearby?'")
-    print("="*60 + "\n")
+    sys.stdout.write(_EXAMPLES_TEXT)
+
+
+# Inputs handled locally instead of being sent to Gemini
+EXIT_COMMANDS = frozenset({'quit', 'exit', 'q'})
+COMMANDS = {'examples': print_examples}
+
+
+def make_prompt():
+    """
+    Return a function that reads one line of user input.
+    Uses a prompt_toolkit session (persistent history, completion of the demo
+    commands) on a terminal; otherwise falls back to plain input().
+    """
+    if not sys.stdin.isatty():
+        return input
+    try:
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.completion import WordCompleter
+        from prompt_toolkit.history import FileHistory
+    except ImportError:
+        return input
+    
+    session = PromptSession(
+        history=FileHistory(HISTORY_FILE),
+        completer=WordCompleter(sorted(COMMANDS) + ['quit', 'exit'])
+    )
+    return session.prompt
 
 
 def run_interactive_demo():
     """Run the interactive demonstration."""
     try:
+        from gemini_client import GeminiFunctionCallingClient, warm_up
+        
         client = GeminiFunctionCallingClient()
         client.start_chat()
+        # Connect to Gemini while the user reads the banner and types
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
         
         print_welcome()
+        prompt = make_prompt()
         
         while True:
             try:
-                user_input = input("You: ").strip()
+                user_input = prompt("You: ").strip()
                 
                 if not user_input:
                     continue
                 
-                if user_input.lower() in ['quit', 'exit', 'q']:
+                command = user_input.lower()
+                if command in EXIT_COMMANDS:
                     print("\nGoodbye! Thanks for trying the demo.\n")
                     break
                 
-                if user_input.lower() == 'examples':
-                    print_examples()
+                handler = COMMANDS.get(command)
+                if handler:
+                    handler()
                     continue
                 
                 # Send message and get response
                 flow_info = client.send_message(user_input, verbose=True)
                 
                 # Store in conversation history
-                client.conversation_history.append(flow_info)
+                client.add_to_history(flow_info)
                 
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n\nGoodbye! Thanks for trying the demo.\n")
                 break
             except Exception as e:
@@ -90,29 +161,20 @@ def run_example_demo():
     print("="*60 + "\n")
     
     try:
+        from gemini_client import GeminiFunctionCallingClient
+        
         client = GeminiFunctionCallingClient()
         client.start_chat()
         
-        examples = [
-            {
-                'prompt': "I need a mincha minyan at 40.7128, -74.0060. The earliest time is 2025-03-26T13:00:00Z and latest is 2025-03-26T14:00:00Z",
-                'description': "Example 1: Creating a broadcast"
-            },
-            {
-                'prompt': "Find nearby mincha minyans within 2 miles of latitude 40.7130 and longitude -74.0059",
-                'description': "Example 2: Finding nearby broadcasts"
-            }
-        ]
-        
-        for i, example in enumerate(examples, 1):
+        for i, example in enumerate(EXAMPLES, 1):
             print(f"\n{'='*60}")
             print(f"Example {i}: {example['description']}")
             print(f"{'='*60}\n")
             
             flow_info = client.send_message(example['prompt'], verbose=True)
-            client.conversation_history.append(flow_info)
+            client.add_to_history(flow_info)
             
-            if i < len(examples):
+            if i < len(EXAMPLES):
                 input("\nPress Enter to continue to next example...")
         
         print("\n" + "="*60)
@@ -124,9 +186,112 @@ def run_example_demo():
         sys.exit(1)
 
 
+class _RateLimitRetryingChat:
+    """
+    Wraps a ChatSession so each Gemini request is retried with exponential backoff
+    on 429 RESOURCE_EXHAUSTED. Only the model call is repeated, never the function
+    calls of the turn (a failed send_message leaves the chat history untouched),
+    so a retry can't POST a second broadcast.
+    """
+    
+    def __init__(self, chat, retry_on):
+        self._chat = chat
+        self._retry_on = retry_on
+    
+    def send_message(self, content, **kwargs):
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            try:
+                return self._chat.send_message(content, **kwargs)
+            except self._retry_on:
+                if attempt == BATCH_MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(BATCH_BACKOFF_BASE_SECONDS * 2 ** attempt)
+    
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+def _run_batch_example(client, prompt: str) -> dict:
+    """Run one example in the client's own chat session, retrying rate-limited Gemini calls."""
+    from google.api_core.exceptions import ResourceExhausted
+    
+    client.start_chat()
+    client.chat = _RateLimitRetryingChat(client.chat, ResourceExhausted)
+    return client.send_message(prompt, verbose=False)
+
+
+def run_batch_demo(examples=EXAMPLES, concurrency: int = 4):
+    """
+    Run the scripted examples concurrently, without narration between them.
+    Examples are independent, so their Gemini and API round-trips overlap;
+    concurrency caps the requests in flight to stay under the RPM limit.
+    """
+    print("\n" + "="*60)
+    print(f"  Running Batch Demo ({len(examples)} examples, concurrency {concurrency})")
+    print("="*60 + "\n")
+    
+    try:
+        from gemini_client import GeminiFunctionCallingClient
+        
+        started = time.perf_counter()
+        # Create the clients up front: the first builds the shared model, the rest
+        # reuse it, instead of every worker racing to build it at once
+        clients = [GeminiFunctionCallingClient() for _ in examples]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(_run_batch_example, client, example['prompt'])
+                       for client, example in zip(clients, examples)]
+            
+            for example, future in zip(examples, futures):
+                print(f"\n{'='*60}")
+                print(example['description'])
+                print(f"{'='*60}\n")
+                try:
+                    flow_info = future.result()
+                except Exception as e:
+                    print(f"❌ Error: {e}\n")
+                    continue
+                for fc in flow_info['function_calls']:
+                    print(f"🔧 {fc['name']}({fc['arguments']})")
+                print(f"💬 {flow_info['final_response']}\n")
+        
+        print("\n" + "="*60)
+        print(f"Batch completed in {time.perf_counter() - started:.1f}s")
+        print("="*60 + "\n")
+    
+    except Exception as e:
+        print(f"\n❌ Error during batch demo: {e}\n")
+        sys.exit(1)
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be a positive integer."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
+
+
+def parse_args(argv=None):
+    """Parse command-line options for choosing the demo mode."""
+    parser = argparse.ArgumentParser(description="Gemini Function Calling - Minyan Finder API Demo")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--examples', action='store_true',
+                      help="run the scripted examples one at a time")
+    mode.add_argument('--batch', action='store_true',
+                      help="run the scripted examples concurrently")
+    parser.add_argument('--concurrency', type=_positive_int, default=4,
+                        help="examples in flight at once with --batch (default: 4)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == '--examples':
+    args = parse_args()
+    if args.examples:
         run_example_demo()
+    elif args.batch:
+        run_batch_demo(concurrency=args.concurrency)
     else:
         run_interactive_demo()
-
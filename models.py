@@ -1,45 +1,169 @@
 """
 Database models for the Minyan Finder API.
 """
-from datetime import datetime
-from uuid import uuid4
-from sqlalchemy import Column, String, Float, DateTime, Boolean
+from datetime import timezone
+from sqlalchemy import Column, String, Float, DateTime, Boolean, DDL, Index, and_, event, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+import orjson
 import os
 
 Base = declarative_base()
 
+# Postgres extensions behind the nearby-search index (earthdistance needs cube),
+# created ahead of the tables so create_all() works on a fresh database
+REQUIRED_EXTENSIONS = ('cube', 'earthdistance')
+for _extension in REQUIRED_EXTENSIONS:
+    event.listen(Base.metadata, 'before_create',
+                 DDL(f'CREATE EXTENSION IF NOT EXISTS {_extension}').execute_if(dialect='postgresql'))
+del _extension
+METERS_PER_MILE = 1609.344
+
+
+# strftime formats matching isoformat(), which omits microseconds when they are zero
+_ISO_Z_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+_ISO_Z_MICRO_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def _iso(value):
+    """
+    Format a datetime as ISO 8601 UTC with a 'Z' suffix (None passes through).
+    Naive values are taken to be UTC already; aware ones are converted.
+    """
+    if not value:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(_ISO_Z_MICRO_FORMAT if value.microsecond else _ISO_Z_FORMAT)
+
+
+def _utc(value):
+    """Normalize an aware datetime to UTC for orjson to encode; naive values are already UTC."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc)
+    return value
+
+
+# Naive datetimes are UTC; emit them, and aware UTC ones, with a 'Z' suffix
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
 
 class Broadcast(Base):
     """Model representing a minyan broadcast."""
     
     __tablename__ = 'broadcasts'
+    # Load server-generated defaults in the INSERT itself so to_dict() right after
+    # a flush doesn't trigger a refresh query
+    __mapper_args__ = {'eager_defaults': True}
     
-    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid4()))
+    # Generated by Postgres (built in since 13; pgcrypto before that) and returned
+    # via RETURNING, so inserts don't build a UUID in Python
+    id = Column(UUID(as_uuid=False), primary_key=True, server_default=text('gen_random_uuid()'))
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     minyan_type = Column(String(20), nullable=False)
     earliest_time = Column(DateTime, nullable=False)
     latest_time = Column(DateTime, nullable=False)
     active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Stamped by the database at insert time (timestamptz) and returned via RETURNING
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    def to_dict(self):
-        """Convert broadcast to dictionary format."""
+    __table_args__ = (
+        # Nearby searches only ever return active broadcasts, so index just those
+        Index('idx_broadcasts_earth_active', func.ll_to_earth(latitude, longitude),
+              postgresql_using='gist', postgresql_where=text('active')),
+    )
+    
+    @classmethod
+    def distance_miles(cls, latitude, longitude):
+        """
+        SQL expression for the great-circle distance in miles from a point, so callers
+        can select or order by distance without computing it per row in Python.
+        """
+        point = func.ll_to_earth(cls.latitude, cls.longitude)
+        return func.earth_distance(func.ll_to_earth(latitude, longitude), point) / METERS_PER_MILE
+    
+    @classmethod
+    def nearby(cls, latitude, longitude, radius_miles):
+        """
+        Filter for active broadcasts within radius_miles of a point.
+        The earth_box test is served by the GIST index; the exact distance check
+        then drops the box's corners, in SQL rather than on fetched rows.
+        """
+        radius_meters = radius_miles * METERS_PER_MILE
+        origin = func.ll_to_earth(latitude, longitude)
+        point = func.ll_to_earth(cls.latitude, cls.longitude)
+        return and_(
+            cls.active,
+            func.earth_box(origin, radius_meters).op('@>')(point),
+            cls.distance_miles(latitude, longitude) <= radius_miles
+        )
+    
+    def _fields(self, timestamp):
+        """API field mapping, with datetimes passed through the given formatter."""
         return {
             'id': self.id,
             'latitude': self.latitude,
             'longitude': self.longitude,
             'minyanType': self.minyan_type,
-            'earliestTime': self.earliest_time.isoformat() + 'Z' if self.earliest_time else None,
-            'latestTime': self.latest_time.isoformat() + 'Z' if self.latest_time else None,
+            'earliestTime': timestamp(self.earliest_time),
+            'latestTime': timestamp(self.latest_time),
             'active': self.active,
-            'createdAt': self.created_at.isoformat() + 'Z' if self.created_at else None
+            'createdAt': timestamp(self.created_at)
         }
+    
+    def to_dict(self):
+        """Convert broadcast to dictionary format."""
+        return self._fields(_iso)
+    
+    def to_json(self):
+        """
+        Serialize the broadcast straight to JSON bytes with orjson.
+        Datetimes are encoded natively, in the same UTC 'Z' form as to_dict().
+        """
+        return orjson.dumps(self._fields(_utc), option=_ORJSON_OPTIONS)
+
+
+# Batch sizes for psycopg2's fast executemany paths
+EXECUTEMANY_PAGE_SIZE = 500
+
+
+def create_db_engine(database_url=None):
+    """
+    Create the SQLAlchemy (2.x) engine for DATABASE_URL on the psycopg2 driver.
+    Multi-row INSERTs (session.add_all(broadcasts) then a flush) go out as a few
+    INSERT ... VALUES statements via insertmanyvalues, and values_plus_batch lets
+    psycopg2 batch executemany UPDATEs/DELETEs too, instead of one round-trip per row.
+    """
+    url = make_url(database_url or os.getenv('DATABASE_URL'))
+    # Plain postgresql:// (or Render/Heroku-style postgres://) URLs pick the driver
+    # by SQLAlchemy version; pin psycopg2, which the executemany options belong to
+    if url.drivername in ('postgres', 'postgresql'):
+        url = url.set(drivername='postgresql+psycopg2')
+    
+    return create_engine(
+        url,
+        executemany_mode='values_plus_batch',
+        insertmanyvalues_page_size=EXECUTEMANY_PAGE_SIZE,
+        executemany_batch_page_size=EXECUTEMANY_PAGE_SIZE
+    )
+
+
+def create_session_factory(engine):
+    """Return a session factory bound to the given engine."""
+    return sessionmaker(bind=engine)
+
+
+_session_factory = None
 
 
-# Database initialization is now handled in app.py
+def get_session():
+    """Open a session on the DATABASE_URL engine, creating the engine on first use."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = create_session_factory(create_db_engine())
+    return _session_factory()
 
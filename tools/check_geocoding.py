@@ -0,0 +1,56 @@
+"""
+Regression checks for local-map geocoding, run without network access:
+
+    python -m tools.check_geocoding
+
+Each case maps a query to the city it must resolve to from the local map, or to
+None when it must not match locally and should be left to Nominatim.
+"""
+import sys
+import functions
+
+CASES = [
+    ('Brooklyn', 'Brooklyn, NY'),
+    ('brooklyn, ny', 'Brooklyn, NY'),
+    ('cedarhurst ny', 'Cedarhurst, NY'),
+    ('the brooklyn, ny area', 'Brooklyn, NY'),
+    # Same-named places elsewhere must not resolve to the local entry
+    ('Portland, ME', None),
+    ('Kansas City, KS', None),
+    ('Albany, GA', None),
+    ('Washington Heights', None),
+    ('Long Beach, CA', None),
+    ('Miami Beach, FL', None),
+    ('Brooklyn, MI', None),
+    # A known state abbreviation alone must not pick a city in that state
+    ('Springfield, IL', None),
+    ('Monroe, LA', None),
+    ('slope', 'Park Slope, Brooklyn, NY'),
+    ('williamsburg brooklyn', 'Williamsburg, Brooklyn, NY'),
+    # A bare state must resolve to a city in that state, not one whose name
+    # starts with the same letters
+    ('MA', 'Boston, MA'),
+    ('PA', 'Philadelphia, PA'),
+    ('VA', 'Virginia Beach, VA'),
+    ('WA', 'Seattle, WA'),
+    ('MI', 'Detroit, MI'),
+    ('FL', 'Jacksonville, FL'),
+]
+
+
+def main():
+    # Misses return None instead of reaching Nominatim
+    functions._geocode_cached = lambda location_norm: None
+    failures = 0
+    for query, expected in CASES:
+        result = functions.handle_geocode_location({'location': query})
+        actual = result['data']['display_name'] if result['success'] else None
+        if actual != expected:
+            failures += 1
+            print(f"FAIL {query!r}: expected {expected!r}, got {actual!r}")
+    print(f"{len(CASES) - failures}/{len(CASES)} geocoding checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
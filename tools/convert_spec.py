@@ -0,0 +1,34 @@
+"""
+Convert the OpenAPI specification from YAML to a JSON sibling file.
+
+load_openapi_spec() reads the JSON file instead of the YAML whenever it is at
+least as new as the YAML source, which makes repeated cold starts faster:
+
+    python -m tools.convert_spec openapi.yaml
+
+openapi.json is a local build artifact; openapi.yaml stays the source of truth.
+"""
+import argparse
+import json
+import os
+from functions import load_openapi_spec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('spec', nargs='?', default='openapi.yaml', help='Path to the OpenAPI YAML spec')
+    args = parser.parse_args()
+    
+    json_path = os.path.splitext(args.spec)[0] + '.json'
+    if os.path.exists(json_path):
+        # Make sure the YAML is what gets parsed below, not a stale JSON copy
+        os.remove(json_path)
+    
+    spec = load_openapi_spec(args.spec)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Wrote {json_path}")
+
+
+if __name__ == '__main__':
+    main()
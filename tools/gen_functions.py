@@ -0,0 +1,52 @@
+"""
+Generate generated_functions.py from the OpenAPI specification.
+
+Runs the OpenAPI -> Gemini conversion once, ahead of time, and prints a Python
+module holding the resulting declarations as a literal:
+
+    python -m tools.gen_functions openapi.yaml > generated_functions.py
+
+Re-run this whenever openapi.yaml changes.
+"""
+import argparse
+import sys
+from typing import Any
+from functions import load_openapi_spec, convert_openapi_to_gemini_functions
+
+HEADER = '''"""
+Gemini function declarations generated from {spec}.
+Do not edit by hand - regenerate with:
+
+    python -m tools.gen_functions {spec} > generated_functions.py
+"""
+
+'''
+
+
+def to_literal(value: Any, indent: int = 0) -> str:
+    """Format a JSON-like value as an indented Python literal."""
+    pad = ' ' * (indent + 4)
+    if isinstance(value, dict) and value:
+        items = [f"{pad}{k!r}: {to_literal(v, indent + 4)}," for k, v in value.items()]
+        return '{\n' + '\n'.join(items) + '\n' + ' ' * indent + '}'
+    if isinstance(value, list) and value and any(isinstance(v, (dict, list)) for v in value):
+        items = [f"{pad}{to_literal(v, indent + 4)}," for v in value]
+        return '[\n' + '\n'.join(items) + '\n' + ' ' * indent + ']'
+    return repr(value)
+
+
+def render_module(spec_path: str) -> str:
+    """Render the generated module source for the given spec file."""
+    functions = convert_openapi_to_gemini_functions(load_openapi_spec(spec_path))
+    return HEADER.format(spec=spec_path) + f"GEMINI_FUNCTIONS = {to_literal(functions)}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('spec', nargs='?', default='openapi.yaml', help='Path to the OpenAPI spec')
+    args = parser.parse_args()
+    sys.stdout.write(render_module(args.spec))
+
+
+if __name__ == '__main__':
+    main()